@@ -6,15 +6,36 @@ import argparse
 import datetime
 import math
 import time
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 # Remove project root from sys.path to avoid namespace shadowing of installed package
 ROOT = os.path.dirname(os.path.abspath(__file__))
 sys.path = [p for p in sys.path if os.path.abspath(p) != ROOT]
 
 import mstarpy as ms
+import requests
+
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None  # type: ignore
+
+try:
+    import diskcache  # type: ignore
+except ImportError:
+    diskcache = None  # type: ignore
 
 CONFIG_PATH = os.path.join(ROOT, "methods_config.json")
+# Upper bound on concurrent API method calls per instrument (on top of the per-ISIN pool in main)
+METHOD_WORKERS = 8
+# On-disk cache of per-(instrument, ISIN, method) responses, shared by CLI runs and the dashboard refresh
+CACHE_DIR = os.path.join(ROOT, ".mstar_cache")
+DEFAULT_CACHE_TTL = 6 * 3600
+
+_cache: Any = None
+_cache_ttl: float = DEFAULT_CACHE_TTL
+_session: Optional[requests.Session] = None
 
 
 def read_isins(file_path: str) -> List[str]:
@@ -61,20 +82,142 @@ def load_methods() -> Dict[str, List[str]]:
         }
 
 
-def safe_call(obj: Any, method: str) -> Any:
+_MISSING = object()
+
+
+def _resolve_method(obj: Any, method: str) -> Any:
+    try:
+        return getattr(obj, method, _MISSING)
+    except Exception:
+        return _MISSING
+
+
+def _missing_error(obj: Any, method: str) -> Dict[str, Any]:
+    return {"_error": f"'{type(obj).__name__}' object has no attribute '{method}'"}
+
+
+def _invoke(fn: Callable[..., Any], method: str) -> Any:
     try:
         # Special handling for parameterized methods
         if method == "nav":
             end_date = datetime.datetime.utcnow()
             start_date = end_date - datetime.timedelta(days=365 * 5)
-            return getattr(obj, method)(start_date=start_date, end_date=end_date, frequency="daily")
+            return fn(start_date=start_date, end_date=end_date, frequency="daily")
         # Default: zero-arg method call
-        fn = getattr(obj, method)
         return fn()
     except Exception as exc:
         return {"_error": str(exc)}
 
 
+class _PooledRequests:
+    """Stand-in for the ``requests`` module inside mstarpy that sends every GET through one Session.
+
+    mstarpy calls ``requests.get`` directly, which opens a fresh TCP + TLS connection per API
+    call; routing those calls through a shared pooled Session keeps connections alive across
+    methods and ISINs.
+    """
+
+    def __init__(self, session: requests.Session) -> None:
+        self._session = session
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self._session.get(url, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(requests, name)
+
+
+def use_pooled_session(pool_size: int) -> None:
+    global _session
+    if _session is not None:
+        return
+    _session = requests.Session()
+    # Enough connections per host for every concurrent method call, so none are discarded
+    adapter = requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=max(10, pool_size))
+    _session.mount("https://", adapter)
+    _session.mount("http://", adapter)
+    shim = _PooledRequests(_session)
+    for name, module in list(sys.modules.items()):
+        if name.split(".", 1)[0] == "mstarpy" and getattr(module, "requests", None) is requests:
+            setattr(module, "requests", shim)
+
+
+def open_cache(ttl: float = DEFAULT_CACHE_TTL) -> None:
+    global _cache, _cache_ttl
+    _cache_ttl = ttl
+    if diskcache is None or _cache is not None:
+        return
+    try:
+        _cache = diskcache.Cache(CACHE_DIR)
+    except Exception as exc:
+        print(f"Warning: response cache disabled ({exc})")
+
+
+def close_cache() -> None:
+    global _cache
+    if _cache is not None:
+        _cache.close()
+        _cache = None
+
+
+def _cache_get(scope: Optional[Tuple[str, str]], method: str) -> Any:
+    if _cache is None or scope is None:
+        return _MISSING
+    try:
+        entry = _cache.get((*scope, method), default=None)
+    except Exception:
+        return _MISSING
+    if not entry:
+        return _MISSING
+    stored_at, value = entry
+    # TTL is checked on read so a shorter --ttl applies to entries written by earlier runs
+    if time.time() - stored_at > _cache_ttl:
+        return _MISSING
+    return value
+
+
+def _cache_put(scope: Optional[Tuple[str, str]], method: str, value: Any) -> None:
+    if _cache is None or scope is None:
+        return
+    # Never cache failures, so a later run retries them
+    if isinstance(value, dict) and "_error" in value:
+        return
+    try:
+        _cache.set((*scope, method), (time.time(), value))
+    except Exception:
+        pass
+
+
+def call_methods(obj: Any, methods: List[str], scope: Optional[Tuple[str, str]] = None) -> Dict[str, Any]:
+    if not methods:
+        return {}
+    # Resolve bound methods once up front; unknown names are reported once and skipped
+    bound = [(m, _resolve_method(obj, m)) for m in methods]
+    missing = [m for m, fn in bound if fn is _MISSING]
+    if missing:
+        print(f"  … {type(obj).__name__} has no method(s): {', '.join(missing)}")
+    results: Dict[str, Any] = {m: _missing_error(obj, m) for m in missing}
+    calls = []
+    for m, fn in bound:
+        if fn is _MISSING:
+            continue
+        cached = _cache_get(scope, m)
+        if cached is _MISSING:
+            calls.append((m, fn))
+        else:
+            results[m] = cached
+    if calls:
+        # Methods are independent HTTP calls on the same read-only instance; run them side by side
+        with ThreadPoolExecutor(max_workers=min(len(calls), METHOD_WORKERS)) as executor:
+            futures = {executor.submit(_invoke, fn, m): m for m, fn in calls}
+            for future in as_completed(futures):
+                m = futures[future]
+                results[m] = future.result()
+                _cache_put(scope, m, results[m])
+    # Preserve the configured method order in the output
+    return {m: results[m] for m in methods}
+
+
 def fetch_full_fund(isin: str, methods: List[str]) -> Dict[str, Any]:
     fund = ms.Funds(isin)
     out: Dict[str, Any] = {
@@ -82,16 +225,14 @@ def fetch_full_fund(isin: str, methods: List[str]) -> Dict[str, Any]:
         "isin": isin,
         "dataPoint": fund.dataPoint(["isin", "name", "previousClosePrice"]) or {},
     }
-    for m in methods:
-        out[m] = safe_call(fund, m)
+    out.update(call_methods(fund, methods, scope=("fund", isin)))
     return out
 
 
 def fetch_full_stock(isin: str, methods: List[str]) -> Dict[str, Any]:
     stock = ms.Stock(isin)
     out: Dict[str, Any] = {"_class": "stock", "isin": isin}
-    for m in methods:
-        out[m] = safe_call(stock, m)
+    out.update(call_methods(stock, methods, scope=("stock", isin)))
     return out
 
 
@@ -136,7 +277,7 @@ def fetch_info_for_isin(isin: str, full: bool, methods_cfg: Dict[str, List[str]]
         return {"isin": isin, "error": str(exc), "source": "unknown"}
 
 
-def write_json(rows: List[Dict[str, Any]], out_path: str) -> None:
+def _serializer() -> Callable[[Any], Any]:
     try:
         import numpy as _np  # type: ignore
     except Exception:
@@ -181,11 +322,88 @@ def write_json(rows: List[Dict[str, Any]], out_path: str) -> None:
         # Fallback to string representation
         return str(obj)
 
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(_to_serializable(rows), f, ensure_ascii=False, indent=2, allow_nan=False)
+    return _to_serializable
+
+
+def _dumps(obj: Any, pretty: bool = True) -> bytes:
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+        try:
+            return orjson.dumps(obj, option=option)
+        except TypeError:
+            # orjson.JSONEncodeError (a TypeError) for values json accepts, e.g. ints beyond 64 bits
+            pass
+    return json.dumps(obj, ensure_ascii=False, indent=2 if pretty else None, allow_nan=False).encode("utf-8")
+
+
+class RowWriter:
+    """Stream rows to a JSON array (``json``) or JSON Lines (``jsonl``) file as they arrive.
+
+    Rows are written in index order even when they complete out of order, so only rows
+    still waiting on an earlier ISIN are held in memory. Output goes to a temporary file
+    that replaces ``out_path`` on close, so readers never see a half-written dataset.
+    """
+
+    def __init__(self, out_path: str, fmt: str = "json") -> None:
+        self.out_path = out_path
+        self.fmt = fmt
+        self.written = 0
+        self._tmp_path = out_path + ".tmp"
+        self._to_serializable = _serializer()
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._next = 0
+        self._f = open(self._tmp_path, "wb")
+        if fmt == "json":
+            self._f.write(b"[")
+
+    def add(self, idx: int, row: Dict[str, Any]) -> None:
+        self._pending[idx] = row
+        while self._next in self._pending:
+            self._write(self._pending.pop(self._next))
+            self._next += 1
+
+    def _write(self, row: Dict[str, Any]) -> None:
+        payload = self._to_serializable(row)
+        if self.fmt == "jsonl":
+            self._f.write(_dumps(payload, pretty=False) + b"\n")
+        else:
+            # Indent the row one level so the file matches a pretty-printed array;
+            # JSON escapes newlines inside strings, so every raw newline is structural
+            body = _dumps(payload).replace(b"\n", b"\n  ")
+            self._f.write((b",\n  " if self.written else b"\n  ") + body)
+        self.written += 1
+
+    def close(self) -> None:
+        for idx in sorted(self._pending):
+            self._write(self._pending.pop(idx))
+        if self.fmt == "json":
+            self._f.write(b"\n]" if self.written else b"]")
+        self._f.close()
+        os.replace(self._tmp_path, self.out_path)
+
+    def abort(self) -> None:
+        self._f.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
 
 
 def write_csv(rows: List[Dict[str, Any]], out_path: str) -> None:
+    try:
+        import pandas as _pd  # type: ignore
+    except Exception:
+        _pd = None  # type: ignore
+    if _pd is not None:
+        # One C-level write over the same top-level column union as DictWriter; object dtype keeps
+        # each value as written (no int -> float upcast for columns with missing cells). Float NaN
+        # is spelled out first, since to_csv would write it as an empty cell where DictWriter writes nan
+        rows = [
+            {k: ("nan" if isinstance(v, float) and math.isnan(v) else v) for k, v in row.items()}
+            for row in rows
+        ]
+        df = _pd.DataFrame(rows, dtype=object)
+        df = df.reindex(columns=sorted(df.columns))
+        df.to_csv(out_path, index=False, encoding="utf-8", lineterminator="\r\n")
+        return
     fieldnames = sorted({k for row in rows for k in row.keys()})
     with open(out_path, "w", newline="", encoding="utf-8") as f:
         writer = csv.DictWriter(f, fieldnames=fieldnames)
@@ -194,12 +412,30 @@ def write_csv(rows: List[Dict[str, Any]], out_path: str) -> None:
             writer.writerow(row)
 
 
-def main() -> int:
+def main(argv: Optional[List[str]] = None, on_progress: Optional[Callable[[int, int, str], None]] = None) -> int:
     parser = argparse.ArgumentParser()
     parser.add_argument("--full", action="store_true", help="Call many zero-arg API methods")
-    parser.add_argument("--format", choices=["json", "csv"], default="json", help="Output format")
-    args = parser.parse_args()
+    parser.add_argument(
+        "--format",
+        choices=["json", "jsonl", "csv"],
+        default="json",
+        help="Output format (json and jsonl are written incrementally as ISINs complete)",
+    )
+    parser.add_argument("--workers", type=int, default=8, help="Number of ISINs fetched concurrently")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore and do not update the on-disk response cache")
+    parser.add_argument("--ttl", type=float, default=DEFAULT_CACHE_TTL, help="Seconds a cached API response stays valid")
+    args = parser.parse_args(argv)
+
+    use_pooled_session(max(1, args.workers) * METHOD_WORKERS)
+    if not args.no_cache:
+        open_cache(args.ttl)
+    try:
+        return _run(args, on_progress)
+    finally:
+        close_cache()
+
 
+def _run(args: argparse.Namespace, on_progress: Optional[Callable[[int, int, str], None]]) -> int:
     methods_cfg = load_methods()
 
     root = ROOT
@@ -213,32 +449,65 @@ def main() -> int:
         return 1
     success = 0
     failure = 0
-    results: List[Dict[str, Any]] = []
-    for i, isin in enumerate(isins, 1):
-        print(f"[{i}/{len(isins)}] Fetching {isin}…")
+    workers = max(1, args.workers)
+    # json/jsonl rows go straight to disk as they complete; only csv keeps every row in memory
+    writer: Optional[RowWriter] = None
+    if args.format == "csv":
+        out_path = os.path.join(root, "isin_output.csv")
+    else:
+        out_path = os.path.join(root, f"isin_output.{args.format}")
+        writer = RowWriter(out_path, args.format)
+    results: List[Dict[str, Any]] = [{} for _ in isins]
+
+    def _timed_fetch(isin: str) -> Tuple[Dict[str, Any], float]:
         started = time.time()
         data = fetch_info_for_isin(isin, full=args.full, methods_cfg=methods_cfg)
-        elapsed = time.time() - started
-        results.append(data)
-        if isinstance(data, dict) and data.get("_class") == "unknown" and data.get("_error"):
-            failure += 1
-            print(f"  ✗ Failed {isin} ({elapsed:.2f}s): {data.get('_error')}")
-        else:
-            success += 1
-            print(f"  ✓ Done {isin} ({elapsed:.2f}s)")
+        return data, time.time() - started
 
-    if args.format == "json":
-        out_path = os.path.join(root, "isin_output.json")
-        write_json(results, out_path)
+    print(f"Fetching {len(isins)} ISINs with {workers} workers…")
+    try:
+        # mstarpy is a synchronous requests-based client, so threads are enough to overlap network waits
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_timed_fetch, isin): idx for idx, isin in enumerate(isins)}
+            for done, future in enumerate(as_completed(futures), 1):
+                idx = futures[future]
+                isin = isins[idx]
+                try:
+                    data, elapsed = future.result()
+                except Exception as exc:
+                    data, elapsed = {"isin": isin, "_class": "unknown", "_error": str(exc)}, 0.0
+                # Keep output order identical to ISINs.txt regardless of completion order
+                if writer is not None:
+                    writer.add(idx, data)
+                else:
+                    results[idx] = data
+                if isinstance(data, dict) and data.get("_class") == "unknown" and data.get("_error"):
+                    failure += 1
+                    print(f"[{done}/{len(isins)}] ✗ Failed {isin} ({elapsed:.2f}s): {data.get('_error')}")
+                else:
+                    success += 1
+                    print(f"[{done}/{len(isins)}] ✓ Done {isin} ({elapsed:.2f}s)")
+                if on_progress is not None:
+                    on_progress(done, len(isins), isin)
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+
+    if writer is not None:
+        writer.close()
     else:
-        out_path = os.path.join(root, "isin_output.csv")
         write_csv(results, out_path)
 
-    # Validate JSON by reloading
     if args.format == "json":
+        # Validate JSON by reloading
         try:
-            with open(out_path, "r", encoding="utf-8") as f:
-                _ = json.load(f)
+            if orjson is not None:
+                with open(out_path, "rb") as f:
+                    _ = orjson.loads(f.read())
+            else:
+                with open(out_path, "r", encoding="utf-8") as f:
+                    _ = json.load(f)
             print("Output JSON validated successfully (parsed without errors).")
         except Exception as exc:
             print(f"Warning: JSON validation failed: {exc}")
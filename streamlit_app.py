@@ -1,27 +1,54 @@
 import json
+import math
 import os
+import queue
 import sys
-import subprocess
-from typing import Any, Dict, List, Optional, Tuple
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
 import pandas as pd
 import numpy as np
 import altair as alt
+import pyarrow as pa
+import pyarrow.parquet as pq
 import streamlit as st
 
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None  # type: ignore
+
 ROOT = os.path.dirname(os.path.abspath(__file__))
 DATA_PATH = os.path.join(ROOT, "isin_output.json")
+PRICES_PATH = os.path.join(ROOT, "isin_prices.parquet")
+# Bump whenever the price parsing changes so existing side-cars are rebuilt
+PRICES_FORMAT = "1"
+PRICES_COLS = ["date", "price", "isin", "source"]
 ISINS_PATH = os.path.join(ROOT, "ISINs.txt")
 CONFIG_PATH = os.path.join(ROOT, "methods_config.json")
-FETCH_SCRIPT = os.path.join(ROOT, "fetch_isins.py")
+# Per-fund caches keyed on (mtime, isin): room for one file's funds, older files age out
+FUND_CACHE_ENTRIES = 64
 
 
-def load_data() -> List[Dict[str, Any]]:
+def data_mtime() -> Optional[float]:
     if not os.path.exists(DATA_PATH):
-        st.error(f"File not found: {DATA_PATH}. Run fetch_isins.py first.")
-        return []
+        return None
+    return os.path.getmtime(DATA_PATH)
+
+
+def load_data() -> List[Dict[str, Any]]:
+    # Parsed once per file mtime through load_dataset
+    if orjson is not None:
+        with open(DATA_PATH, "rb") as f:
+            return orjson.loads(f.read())
     with open(DATA_PATH, "r", encoding="utf-8") as f:
         return json.load(f)
+
+
+def index_by_isin(data: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    return {d.get("isin"): d for d in data if isinstance(d, dict)}
+
+
 def _fund_display_name(entry: Dict[str, Any]) -> str:
     isin = entry.get("isin", "?")
     name = None
@@ -36,52 +63,143 @@ def _fund_display_name(entry: Dict[str, Any]) -> str:
     return f"{name or 'Unnamed'} ({isin})"
 
 
+@st.cache_resource
+def _fetch_lock() -> threading.Lock:
+    # Shared by all sessions so two refreshes never write isin_output.json at the same time
+    return threading.Lock()
+
+
+def _fetch_worker(argv: List[str], events: "queue.Queue[Tuple[Any, ...]]", lock: threading.Lock) -> None:
+    # Runs off the script thread: report back through the queue only, never call st.* here
+    if not lock.acquire(blocking=False):
+        events.put(("error", "Another fetch is already running."))
+        return
+    try:
+        # fetch_isins drops ROOT from sys.path on import (to avoid shadowing mstarpy),
+        # so make sure it is importable first
+        if ROOT not in sys.path:
+            sys.path.insert(0, ROOT)
+        import fetch_isins
 
-def flatten_values(obj: Any) -> Any:
-    if isinstance(obj, dict):
-        if set(obj.keys()) == {"value"}:
-            return obj["value"]
-        if "value" in obj and isinstance(obj.get("properties"), dict) and len(obj) <= 3:
-            base = {k: flatten_values(v) for k, v in obj.items() if k != "properties"}
-            props = {f"prop_{k}": flatten_values(v) for k, v in obj.get("properties", {}).items()}
-            return {**base, **props}
-        return {k: flatten_values(v) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [flatten_values(x) for x in obj]
-    return obj
+        rc = fetch_isins.main(argv, on_progress=lambda done, total, isin: events.put(("progress", done, total, isin)))
+        events.put(("done", rc))
+    except BaseException as exc:
+        events.put(("error", str(exc)))
+    finally:
+        lock.release()
 
 
 def run_fetch(full: bool = True) -> None:
-    args = [sys.executable, FETCH_SCRIPT, "--format", "json"]
+    job = st.session_state.get("fetch_job")
+    if job and job["thread"].is_alive():
+        st.info("A fetch is already running.")
+        return
+    argv = ["--format", "json"]
     if full:
-        args.append("--full")
-    st.info("Running fetch script... (this may take a minute)")
-    try:
-        subprocess.run(args, cwd=ROOT, check=True)
-        st.success("Fetch complete. Reload the page to see updated data.")
-    except subprocess.CalledProcessError as e:
-        st.error(f"Fetch failed: {e}")
+        argv.append("--full")
+    events: "queue.Queue[Tuple[Any, ...]]" = queue.Queue()
+    thread = threading.Thread(target=_fetch_worker, args=(argv, events, _fetch_lock()), daemon=True)
+    thread.start()
+    st.session_state["fetch_job"] = {"thread": thread, "events": events, "done": 0, "total": 0, "last": None}
 
 
-def render_overview(data: List[Dict[str, Any]]) -> None:
+@st.fragment(run_every=1.0)
+def _fetch_status() -> None:
+    job = st.session_state.get("fetch_job")
+    if not job:
+        return
+    # Checked before draining: the worker queues its last event before exiting, so a thread
+    # seen dead here has nothing left to post once the queue is empty
+    alive = job["thread"].is_alive()
+    result = None
+    while True:
+        try:
+            event = job["events"].get_nowait()
+        except queue.Empty:
+            break
+        if event[0] == "progress":
+            _, job["done"], job["total"], job["last"] = event
+        else:
+            result = event
+    if result is None and not alive:
+        result = ("error", "Fetch stopped unexpectedly.")
+    if result is not None:
+        st.session_state.pop("fetch_job", None)
+        if result[0] == "done" and result[1] == 0:
+            st.session_state["fetch_result"] = ("success", "Fetch complete. Data reloaded.")
+        elif result[0] == "done":
+            st.session_state["fetch_result"] = ("error", f"Fetch failed (exit code {result[1]}).")
+        else:
+            st.session_state["fetch_result"] = ("error", f"Fetch failed: {result[1]}")
+        # Full rerun so every tab picks up the rewritten isin_output.json
+        st.rerun()
+    with st.status(f"Fetching data… {job['done']}/{job['total'] or '?'}", state="running"):
+        if job["total"]:
+            st.progress(job["done"] / job["total"])
+        if job["last"]:
+            st.write(f"Last completed: {job['last']}")
+
+
+OVERVIEW_COLS = ["isin", "_class", "dataPoint.name.value", "overview.name", "overview.companyName"]
+
+
+def _overview_names(flat: pd.DataFrame) -> pd.DataFrame:
+    flat = flat.reindex(columns=OVERVIEW_COLS)
+    # Same precedence as before: fund datapoint name, then overview name, then company name
+    candidates = [flat[c].where(flat[c].ne("")) for c in OVERVIEW_COLS[2:]]
+    name = candidates[0].where(flat["_class"].eq("fund"))
+    for fallback in candidates[1:]:
+        name = name.fillna(fallback)
+    return pd.DataFrame({"isin": flat["isin"], "_class": flat["_class"], "name": name})
+
+
+def _overview_frame(data: List[Dict[str, Any]]) -> pd.DataFrame:
+    # Normalize only the subtrees the table reads; running json_normalize over the full
+    # payload would also flatten holdings, nav and every other method's output
+    slim = [
+        {
+            "isin": d.get("isin"),
+            "_class": d.get("_class"),
+            "dataPoint": {"name": d["dataPoint"].get("name")} if isinstance(d.get("dataPoint"), dict) else {},
+            "overview": {k: d["overview"].get(k) for k in ("name", "companyName")} if isinstance(d.get("overview"), dict) else {},
+        }
+        for d in data
+    ]
+    return _overview_names(pd.json_normalize(slim, max_level=2))
+
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def load_overview_table(mtime: float, _data: List[Dict[str, Any]]) -> pa.Table:
+    # Handed to st.dataframe as Arrow so reruns skip the pandas -> Arrow conversion
+    return pa.Table.from_pandas(_overview_frame(_data), preserve_index=False)
+
+
+def render_overview(data: List[Dict[str, Any]], mtime: float) -> None:
     st.subheader("Overview")
-    cols = ["isin", "_class"]
-    rows = []
-    for d in data:
-        entry = {k: d.get(k) for k in cols}
-        name = None
-        if d.get("_class") == "fund":
-            dp = d.get("dataPoint", {})
-            if isinstance(dp, dict) and isinstance(dp.get("name"), dict):
-                name = dp["name"].get("value")
-        if not name and "overview" in d:
-            ov = d.get("overview")
-            if isinstance(ov, dict):
-                name = ov.get("name") or ov.get("companyName")
-        entry["name"] = name
-        rows.append(entry)
-    df = pd.DataFrame(rows)
-    st.dataframe(df, use_container_width=True)
+    st.dataframe(load_overview_table(mtime, data), use_container_width=True)
+
+
+# Quarter key -> (month, day) of the quarter end date
+QUARTER_ENDS = {"naQ1": (3, 31), "naQ2": (6, 30), "naQ3": (9, 30), "naQ4": (12, 31)}
+
+
+def _quarterly_price_frame(rows: List[Dict[str, Any]]) -> Optional[pd.DataFrame]:
+    # Filter on the raw rows: a single missing/None yr would turn the whole column into float
+    df = pd.DataFrame([r for r in rows if isinstance(r, dict) and isinstance(r.get("yr"), int)])
+    if "yr" not in df.columns:
+        return None
+    q_cols = [c for c in QUARTER_ENDS if c in df.columns]
+    if df.empty or not q_cols:
+        return None
+    long = df[["yr", *q_cols]].melt(id_vars="yr", var_name="q", value_name="price").dropna(subset=["price"])
+    month = long["q"].map({k: m for k, (m, _) in QUARTER_ENDS.items()})
+    day = long["q"].map({k: d for k, (_, d) in QUARTER_ENDS.items()})
+    out = pd.DataFrame({
+        "date": pd.to_datetime({"year": long["yr"].astype(int), "month": month, "day": day}),
+        "price": pd.to_numeric(long["price"], errors="coerce"),
+    })
+    out = out.dropna().sort_values("date").reset_index(drop=True)
+    return out if not out.empty else None
 
 
 def _price_series_from_graphdata(current: Dict[str, Any]) -> Optional[pd.DataFrame]:
@@ -93,32 +211,43 @@ def _price_series_from_graphdata(current: Dict[str, Any]) -> Optional[pd.DataFra
     rows = gd.get("data")
     if not isinstance(rows, list) or not rows:
         return None
+    return _quarterly_price_frame(rows)
+
+
+def _nav_records_scalar(points: List[Tuple[Any, Any]]) -> List[Dict[str, Any]]:
+    # Per-point path for payloads the vectorized parse cannot take (epoch numbers, odd date strings)
     records: List[Dict[str, Any]] = []
-    for r in rows:
-        if not isinstance(r, dict):
+    for raw_date, val in points:
+        # Parse date
+        try:
+            if isinstance(raw_date, (int, float)):
+                # Assume ms since epoch if very large
+                if raw_date > 10_000_000_000:
+                    dt = pd.to_datetime(int(raw_date), unit="ms", utc=True).tz_convert(None)
+                else:
+                    dt = pd.to_datetime(int(raw_date), unit="s", utc=True).tz_convert(None)
+            else:
+                dt = pd.to_datetime(str(raw_date))
+        except Exception:
             continue
-        yr = r.get("yr")
-        if not isinstance(yr, int):
+        # Plain float() instead of a scalar pd.to_numeric; unparseable / NaN values are skipped
+        if isinstance(val, list) and len(val) == 1:
+            val = val[0]
+        try:
+            price = float(val)
+        except (TypeError, ValueError):
             continue
-        for q_idx, q_key in enumerate(["naQ1", "naQ2", "naQ3", "naQ4"], start=1):
-            val = r.get(q_key)
-            if val is None:
-                continue
-            # Quarter end dates
-            month_day = {1: "03-31", 2: "06-30", 3: "09-30", 4: "12-31"}[q_idx]
-            date = f"{yr}-{month_day}"
-            records.append({"date": pd.to_datetime(date), "price": pd.to_numeric(val, errors="coerce")})
-    if not records:
-        return None
-    df = pd.DataFrame(records).dropna().sort_values("date")
-    if df.empty:
-        return None
-    return df
+        if math.isnan(price):
+            continue
+        records.append({"date": dt, "price": price})
+    return records
+
+
 def _parse_nav_series(nav_payload: Any) -> Optional[pd.DataFrame]:
     # Expect a list of points; be resilient to different shapes
     if not isinstance(nav_payload, list) or not nav_payload:
         return None
-    records: List[Dict[str, Any]] = []
+    points: List[Tuple[Any, Any]] = []
     for point in nav_payload:
         if not isinstance(point, dict):
             continue
@@ -143,25 +272,26 @@ def _parse_nav_series(nav_payload: Any) -> Optional[pd.DataFrame]:
             val = point.get("v")[0]
         if raw_date is None or val is None:
             continue
-        # Parse date
-        try:
-            if isinstance(raw_date, (int, float)):
-                # Assume ms since epoch if very large
-                if raw_date > 10_000_000_000:
-                    dt = pd.to_datetime(int(raw_date), unit="ms", utc=True).tz_convert(None)
-                else:
-                    dt = pd.to_datetime(int(raw_date), unit="s", utc=True).tz_convert(None)
-            else:
-                dt = pd.to_datetime(str(raw_date))
-        except Exception:
-            continue
-        price = pd.to_numeric(val, errors="coerce")
-        if pd.isna(price):
-            continue
-        records.append({"date": dt, "price": float(price)})
-    if not records:
+        points.append((raw_date, val))
+    if not points:
         return None
-    df = pd.DataFrame(records).dropna().sort_values("date")
+    df = None
+    # Usual shape (ISO date strings, scalar values): one date cast and one numeric cast for the series;
+    # vector values ({v: [nav, ...]}) need the per-point unwrap
+    if all(isinstance(d, str) and not isinstance(v, list) for d, v in points):
+        try:
+            raw = pd.DataFrame(points, columns=["date", "price"])
+            raw["date"] = pd.to_datetime(raw["date"], format="ISO8601")
+            raw["price"] = pd.to_numeric(raw["price"], errors="coerce").astype(float)
+            df = raw[raw["price"].notna()].reset_index(drop=True)
+        except (TypeError, ValueError):
+            df = None
+    if df is None:
+        records = _nav_records_scalar(points)
+        if not records:
+            return None
+        df = pd.DataFrame(records)
+    df = df.dropna().sort_values("date")
     return df if not df.empty else None
 
 
@@ -175,6 +305,94 @@ def _price_series_from_any(current: Dict[str, Any]) -> Tuple[Optional[pd.DataFra
     return _price_series_from_graphdata(current), "graphData"
 
 
+def _source_key() -> Optional[Dict[str, str]]:
+    # Identity of isin_output.json that a price side-car must have been built from
+    try:
+        info = os.stat(DATA_PATH)
+    except OSError:
+        return None
+    return {"source_mtime_ns": str(info.st_mtime_ns), "source_size": str(info.st_size), "format": PRICES_FORMAT}
+
+
+def _read_prices_sidecar(key: Optional[Dict[str, str]]) -> Optional[pd.DataFrame]:
+    # Long price table persisted by build_frames; used only if built from this exact JSON by this format
+    if key is None or not os.path.exists(PRICES_PATH):
+        return None
+    try:
+        schema = pq.read_schema(PRICES_PATH)
+        meta = {k.decode(): v.decode() for k, v in (schema.metadata or {}).items()}
+        if any(meta.get(k) != v for k, v in key.items()) or sorted(schema.names) != sorted(PRICES_COLS):
+            return None
+        return pq.read_table(PRICES_PATH).to_pandas()
+    except Exception:
+        return None
+
+
+def _write_prices_sidecar(prices_df: pd.DataFrame, key: Dict[str, str]) -> None:
+    # Temp file + rename so concurrent sessions never read a half-written file;
+    # on a read-only deployment the table is simply rebuilt from the JSON next start
+    tmp = PRICES_PATH + ".tmp"
+    try:
+        table = pa.Table.from_pandas(prices_df, preserve_index=False)
+        meta = dict(table.schema.metadata or {})
+        meta.update({k.encode(): v.encode() for k, v in key.items()})
+        pq.write_table(table.replace_schema_metadata(meta), tmp, compression="zstd")
+        os.replace(tmp, PRICES_PATH)
+    except Exception:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def build_frames(data: List[Dict[str, Any]], key: Optional[Dict[str, str]]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    # funds_df: one row per entry; prices_df: every entry's preferred price series, long format
+    prices_df = _read_prices_sidecar(key)
+    fund_rows: List[Dict[str, Any]] = []
+    price_frames: List[pd.DataFrame] = []
+    for d in data:
+        if not isinstance(d, dict):
+            continue
+        isin = d.get("isin")
+        fund_rows.append({"isin": isin, "_class": d.get("_class"), "label": _fund_display_name(d)})
+        if prices_df is None:
+            dfp, src = _price_series_from_any(d)
+            if dfp is not None:
+                price_frames.append(dfp.assign(isin=isin, source=src))
+    funds_df = pd.DataFrame(fund_rows, columns=["isin", "_class", "label"])
+    if prices_df is None:
+        if price_frames:
+            prices_df = pd.concat(price_frames, ignore_index=True)
+        else:
+            prices_df = pd.DataFrame(columns=PRICES_COLS)
+        # Skip the write if the JSON was replaced while it was being parsed
+        if key is not None and _source_key() == key:
+            _write_prices_sidecar(prices_df, key)
+    return funds_df, prices_df
+
+
+def price_series(prices_df: pd.DataFrame, isin: Optional[str]) -> Tuple[Optional[pd.DataFrame], str]:
+    # Same contract as _price_series_from_any, served from the prebuilt long table
+    sub = prices_df[prices_df["isin"] == isin]
+    if sub.empty:
+        return None, "graphData"
+    return sub[["date", "price"]].reset_index(drop=True), sub["source"].iloc[0]
+
+
+class Dataset(NamedTuple):
+    raw: List[Dict[str, Any]]
+    by_isin: Dict[str, Dict[str, Any]]
+    frames: Tuple[pd.DataFrame, pd.DataFrame]
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def load_dataset(mtime: float) -> Dataset:
+    # One read-only dataset shared by all sessions; a new mtime replaces it
+    key = _source_key()
+    raw = load_data()
+    return Dataset(raw, index_by_isin(raw), build_frames(raw, key))
+
+
 def _net_assets_series(current: Dict[str, Any]) -> Optional[pd.DataFrame]:
     gd = current.get("graphData") if isinstance(current, dict) else None
     if not isinstance(gd, dict):
@@ -227,19 +445,196 @@ def _net_flows_series(current: Dict[str, Any]) -> Optional[pd.DataFrame]:
     return df if not df.empty else None
 
 
-def render_detail(data: List[Dict[str, Any]]) -> None:
+HOLDINGS_CORE_COLS = [
+    "securityName","ticker","isin","country","sector","sectorCode",
+    "weighting","numberOfShare","marketValue","shareChange",
+    "susEsgRiskScore","susEsgRiskCategory","stockRating","assessment",
+    "economicMoat","currency","localCurrencyCode","currencyName",
+    "firstBoughtDate","maturityDate","coupon",
+]
+
+
+def _categorize_strings(df: pd.DataFrame) -> pd.DataFrame:
+    # Repeated labels (sector, country, currency, ratings...) stored as category codes
+    out = df.copy()
+    for c in out.columns:
+        col = out[c]
+        if col.dtype == object and pd.api.types.infer_dtype(col, skipna=True) == "string" and col.nunique() <= len(col) // 2:
+            out[c] = col.astype("category")
+    return out
+
+
+@st.cache_data(show_spinner=False, max_entries=FUND_CACHE_ENTRIES)
+def build_holdings_frames(
+    mtime: float, isin: Optional[str], _holdings: List[Any]
+) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame, bytes]:
+    # Cached per ISIN per file mtime; the leading underscore keeps the holdings list out of the hash
+    # Build a rich, full-detail table by normalizing all keys
+    dfh_full = pd.json_normalize([h for h in _holdings if isinstance(h, dict)])
+    # Sort by weighting if present
+    if "weighting" in dfh_full.columns:
+        dfh_full = dfh_full.sort_values("weighting", ascending=False)
+    dfh_full = dfh_full.reset_index(drop=True)
+    # Add 1-based rank column at the front
+    dfh_full.insert(0, "rank", dfh_full.index + 1)
+    # Reorder columns: rank + core + rest (without duplicates)
+    rest_cols = [c for c in dfh_full.columns if c not in {"rank", *HOLDINGS_CORE_COLS}]
+    ordered_cols = ["rank"] + [c for c in HOLDINGS_CORE_COLS if c in dfh_full.columns] + rest_cols
+    dfh_full = dfh_full[ordered_cols]
+    # Compact top-25 preview shown above the full table
+    dfh = dfh_full[[c for c in ["rank","securityName","weighting","country","sector","susEsgRiskScore","stockRating"] if c in dfh_full.columns]].head(25)
+    csv = dfh_full.to_csv(index=False).encode("utf-8")
+
+    # Pie source: ensure strictly descending order for slices and legend
+    top_n = min(15, len(dfh))
+    # Use full detail frame for chart source to avoid missing/renamed columns
+    src_for_chart = dfh_full if "securityName" in dfh_full.columns else dfh
+    dfh_top = src_for_chart.sort_values("weighting", ascending=False).head(top_n).copy()
+    for col in ["weighting", "esgRisk"]:
+        if col in dfh_top:
+            dfh_top[col] = pd.to_numeric(dfh_top[col], errors="coerce")
+    # Build a rank-prefixed label for legend and slice ordering
+    dfh_top = dfh_top.reset_index(drop=True)
+    dfh_top["rank"] = dfh_top.index + 1
+    # Guard against missing securityName field
+    dfh_top["_sec"] = dfh_top.get("securityName", pd.Series(["?"]*len(dfh_top)))
+    dfh_top["label"] = dfh_top["rank"].astype(str) + ". " + dfh_top["_sec"].astype(str)
+    # Set categorical order for legend based on descending weight
+    dfh_top["label"] = pd.Categorical(
+        dfh_top["label"], categories=list(dfh_top["label"]), ordered=True
+    )
+
+    # One grouping pass over the preview, then marginalize to each axis
+    agg = (
+        dfh.assign(sector=dfh["sector"].fillna("Unknown"), country=dfh["country"].fillna("Unknown"))
+        .groupby(["sector", "country"], sort=False)["weighting"].sum()
+    )
+    sec_df = agg.groupby(level="sector").sum().reset_index().sort_values("weighting", ascending=False)
+    ctry_df = agg.groupby(level="country").sum().reset_index().sort_values("weighting", ascending=False)
+    # The preview, pie source and CSV above are derived already; compact only the full table
+    return _categorize_strings(dfh_full), dfh, dfh_top, sec_df, ctry_df, csv
+
+
+def _vega_spec(chart: Any, name: str, df: pd.DataFrame) -> Dict[str, Any]:
+    # Below-top-level to_dict applies no theme and swaps no global Altair state (other sessions render concurrently)
+    spec = chart.to_dict(context={"top_level": False})
+    spec["$schema"] = alt.SCHEMA_URL
+    spec["datasets"] = {name: df}
+    return spec
+
+
+@st.cache_data(show_spinner=False, max_entries=FUND_CACHE_ENTRIES)
+def holdings_chart_specs(
+    mtime: float, isin: Optional[str], _dfh_top: pd.DataFrame, _sec_df: pd.DataFrame, _ctry_df: pd.DataFrame
+) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    # Keyed like build_holdings_frames, whose outputs these are
+    # dfh_top carries every normalized holdings column; ship only the fields the pie encodes
+    pie_src = _dfh_top[[c for c in ("label", "weighting", "country", "sector") if c in _dfh_top.columns]]
+    pie_name, sec_name, ctry_name = f"pie-{isin}", f"sector-{isin}", f"country-{isin}"
+    pie = (
+        alt.Chart(alt.NamedData(pie_name))
+        .mark_arc(innerRadius=60)
+        .encode(
+            theta=alt.Theta("weighting:Q", stack=True),
+            color=alt.Color("label:N", sort=None, legend=alt.Legend(title="Security")),
+            order=alt.Order("weighting:Q", sort="descending"),
+            tooltip=["label:O", alt.Tooltip("weighting:Q", format=".2f"), "country:N", "sector:N"],
+        )
+    ).properties(height=380)
+    sec_bar = (
+        alt.Chart(alt.NamedData(sec_name))
+        .mark_bar()
+        .encode(
+            x=alt.X("weighting:Q", title="Total Weighting (%)"),
+            y=alt.Y("sector:N", sort='-x', title="Sector"),
+            tooltip=["sector:N", alt.Tooltip("weighting:Q", format=".2f")],
+        ).properties(height=320)
+    )
+    ctry_bar = (
+        alt.Chart(alt.NamedData(ctry_name))
+        .mark_bar()
+        .encode(
+            x=alt.X("weighting:Q", title="Total Weighting (%)"),
+            y=alt.Y("country:N", sort='-x', title="Country"),
+            tooltip=["country:N", alt.Tooltip("weighting:Q", format=".2f")],
+        ).properties(height=320)
+    )
+    return (
+        _vega_spec(pie, pie_name, pie_src),
+        _vega_spec(sec_bar.interactive(), sec_name, _sec_df),
+        _vega_spec(ctry_bar.interactive(), ctry_name, _ctry_df),
+    )
+
+
+@st.cache_data(show_spinner=False, max_entries=FUND_CACHE_ENTRIES)
+def price_chart_spec(mtime: float, isin: Optional[str], _dfp: pd.DataFrame) -> Dict[str, Any]:
+    name = f"price-{isin}"
+    line = (
+        alt.Chart(alt.NamedData(name))
+        .mark_line(point=True)
+        .encode(
+            x=alt.X("date:T", title="Date", axis=alt.Axis(format="%b %Y", labelAngle=-30)),
+            y=alt.Y("price:Q", title="NAV / Price"),
+            tooltip=[alt.Tooltip("date:T", title="Date"), alt.Tooltip("price:Q", format=".2f", title="Price")],
+        ).properties(height=360)
+    )
+    return _vega_spec(line.interactive(), name, _dfp)
+
+
+@st.cache_data(show_spinner=False, max_entries=FUND_CACHE_ENTRIES)
+def flows_chart_specs(
+    mtime: float, isin: Optional[str], _current: Dict[str, Any]
+) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    # Net assets / net flows series and their charts, None where the fund has no data
+    na_df = _net_assets_series(_current)
+    nf_df = _net_flows_series(_current)
+    na_spec = nf_spec = None
+    if na_df is not None:
+        name = f"net-assets-{isin}"
+        na_chart = (
+            alt.Chart(alt.NamedData(name))
+            .mark_line(point=True)
+            .encode(x=alt.X("date:T", axis=alt.Axis(format="%b %Y", labelAngle=-30)), y=alt.Y("value:Q", title="Net Assets (Bil)"), color=alt.Color("type:N", title=""))
+        ).properties(height=320)
+        na_spec = _vega_spec(na_chart.interactive(), name, na_df)
+    if nf_df is not None:
+        name = f"net-flows-{isin}"
+        nf_chart = (
+            alt.Chart(alt.NamedData(name))
+            .mark_bar()
+            .encode(x=alt.X("date:T", axis=alt.Axis(format="%b %Y", labelAngle=-30)), y=alt.Y("value:Q", title="Net Flows (Bil)"), color=alt.condition(alt.datum.value >= 0, alt.value("#2ca02c"), alt.value("#d62728")))
+        ).properties(height=320)
+        nf_spec = _vega_spec(nf_chart.interactive(), name, nf_df)
+    return na_spec, nf_spec
+
+
+def _detail_memo(mtime: float, isin: Optional[str]) -> Dict[str, Any]:
+    # Detail frames and chart specs for the fund on screen, reset when fund or file changes
+    key = (mtime, isin)
+    memo = st.session_state.get("detail_cache")
+    if not isinstance(memo, dict) or memo.get("key") != key:
+        memo = {"key": key}
+        st.session_state["detail_cache"] = memo
+    return memo
+
+
+def render_detail(
+    by_isin: Dict[str, Dict[str, Any]], mtime: float, frames: Tuple[pd.DataFrame, pd.DataFrame]
+) -> None:
     st.subheader("Detail")
+    funds_df, prices_df = frames
     # Build labeled choices with names
-    label_to_isin = {_fund_display_name(d): d.get("isin") for d in data}
+    label_to_isin = dict(zip(funds_df["label"], funds_df["isin"]))
     labels = list(label_to_isin.keys())
     left, right = st.columns([1, 3])
     with left:
         sel_label = st.selectbox("Select fund", labels, key="detail_select_fund")
         cur = label_to_isin.get(sel_label)
-    current = next((d for d in data if d.get("isin") == cur), None)
+    current = by_isin.get(cur)
     if not current:
         st.warning("No data for selected ISIN")
         return
+    memo = _detail_memo(mtime, cur)
 
     def get_dp(field: str, default: Any = None) -> Any:
         dp = current.get("dataPoint", {}) if isinstance(current, dict) else {}
@@ -281,150 +676,58 @@ def render_detail(data: List[Dict[str, Any]]) -> None:
         st.caption("Top Holdings")
         holdings = current.get("holdings") or []
         if isinstance(holdings, list) and holdings:
-            # Build a rich, full-detail table by normalizing all keys
-            dfh_full = pd.json_normalize([h for h in holdings if isinstance(h, dict)])
-            # Prefer core columns first if available
-            core_cols = [
-                "securityName","ticker","isin","country","sector","sectorCode",
-                "weighting","numberOfShare","marketValue","shareChange",
-                "susEsgRiskScore","susEsgRiskCategory","stockRating","assessment",
-                "economicMoat","currency","localCurrencyCode","currencyName",
-                "firstBoughtDate","maturityDate","coupon",
-            ]
-            # Sort by weighting if present
-            if "weighting" in dfh_full.columns:
-                dfh_full = dfh_full.sort_values("weighting", ascending=False)
-            dfh_full = dfh_full.reset_index(drop=True)
-            # Add 1-based rank column at the front
-            dfh_full.insert(0, "rank", dfh_full.index + 1)
-            # Reorder columns: rank + core + rest (without duplicates)
-            rest_cols = [c for c in dfh_full.columns if c not in {"rank", *core_cols}]
-            ordered_cols = ["rank"] + [c for c in core_cols if c in dfh_full.columns] + rest_cols
-            dfh_full = dfh_full[ordered_cols]
-            # Show an expander with full table and a compact top-25 preview above
-            dfh = dfh_full[[c for c in ["rank","securityName","weighting","country","sector","susEsgRiskScore","stockRating"] if c in dfh_full.columns]].head(25)
+            if "holdings" not in memo:
+                hframes = build_holdings_frames(mtime, cur, holdings)
+                memo["holdings"] = (hframes, holdings_chart_specs(mtime, cur, *hframes[2:5]))
+            (dfh_full, dfh, dfh_top, sec_df, ctry_df, csv), (pie_spec, sec_spec, ctry_spec) = memo["holdings"]
             st.dataframe(dfh, use_container_width=True)
             with st.expander("Show all holding fields (full table)"):
                 st.dataframe(dfh_full, use_container_width=True)
-                csv = dfh_full.to_csv(index=False).encode("utf-8")
                 st.download_button("Download holdings (CSV)", csv, file_name=f"holdings_{current.get('isin')}.csv", mime="text/csv")
 
             # Charts
             st.caption("Top Holdings (Pie by weight)")
-            top_n = min(15, len(dfh))
-            # Ensure strictly descending order for slices and legend
-            # Use full detail frame for chart source to avoid missing/renamed columns
-            src_for_chart = dfh_full if "securityName" in dfh_full.columns else dfh
-            dfh_top = src_for_chart.sort_values("weighting", ascending=False).head(top_n).copy()
-            for col in ["weighting", "esgRisk"]:
-                if col in dfh_top:
-                    dfh_top[col] = pd.to_numeric(dfh_top[col], errors="coerce")
-            # Build a rank-prefixed label for legend and slice ordering
-            dfh_top = dfh_top.reset_index(drop=True)
-            dfh_top["rank"] = dfh_top.index + 1
-            # Guard against missing securityName field
-            dfh_top["_sec"] = dfh_top.get("securityName", pd.Series(["?"]*len(dfh_top)))
-            dfh_top["label"] = dfh_top.apply(lambda r: f"{int(r['rank'])}. {r['_sec']}", axis=1)
-            # Set categorical order for legend based on descending weight
-            dfh_top["label"] = pd.Categorical(
-                dfh_top["label"], categories=list(dfh_top["label"]), ordered=True
-            )
-            pie = (
-                alt.Chart(dfh_top)
-                .mark_arc(innerRadius=60)
-                .encode(
-                    theta=alt.Theta("weighting:Q", stack=True),
-                    color=alt.Color("label:N", sort=None, legend=alt.Legend(title="Security")),
-                    order=alt.Order("weighting:Q", sort="descending"),
-                    tooltip=["label", alt.Tooltip("weighting:Q", format=".2f"), "country", "sector"],
-                )
-            ).properties(height=380)
-            st.altair_chart(pie, use_container_width=True)
+            st.vega_lite_chart(pie_spec, use_container_width=True)
 
             # Sector distribution
             st.caption("Sector Distribution")
-            sec_df = (
-                dfh.assign(sector=dfh["sector"].fillna("Unknown"))
-                .groupby("sector", dropna=False)["weighting"].sum()
-                .reset_index()
-                .sort_values("weighting", ascending=False)
-            )
-            sec_bar = (
-                alt.Chart(sec_df)
-                .mark_bar()
-                .encode(
-                    x=alt.X("weighting:Q", title="Total Weighting (%)"),
-                    y=alt.Y("sector:N", sort='-x', title="Sector"),
-                    tooltip=["sector", alt.Tooltip("weighting:Q", format=".2f")],
-                ).properties(height=320)
-            )
-            st.altair_chart(sec_bar.interactive(), use_container_width=True)
+            st.vega_lite_chart(sec_spec, use_container_width=True)
 
             # Country distribution
             st.caption("Country Distribution")
-            ctry_df = (
-                dfh.assign(country=dfh["country"].fillna("Unknown"))
-                .groupby("country", dropna=False)["weighting"].sum()
-                .reset_index()
-                .sort_values("weighting", ascending=False)
-            )
-            ctry_bar = (
-                alt.Chart(ctry_df)
-                .mark_bar()
-                .encode(
-                    x=alt.X("weighting:Q", title="Total Weighting (%)"),
-                    y=alt.Y("country:N", sort='-x', title="Country"),
-                    tooltip=["country", alt.Tooltip("weighting:Q", format=".2f")],
-                ).properties(height=320)
-            )
-            st.altair_chart(ctry_bar.interactive(), use_container_width=True)
+            st.vega_lite_chart(ctry_spec, use_container_width=True)
         else:
             st.info("No holdings available.")
 
         st.divider()
-        dfp, src = _price_series_from_any(current)
+        if "price" not in memo:
+            dfp, src = price_series(prices_df, cur)
+            memo["price"] = (src, price_chart_spec(mtime, cur, dfp) if dfp is not None else None)
+        src, price_spec = memo["price"]
         st.caption("Price" + (" (NAV)" if src == "NAV" else " (fallback)"))
-        if dfp is not None:
+        if price_spec is not None:
             if src != "NAV":
                 st.info("NAV not available for this fund. Falling back to quarterly graphData-derived series.")
-            line = (
-                alt.Chart(dfp)
-                .mark_line(point=True)
-                .encode(
-                    x=alt.X("date:T", title="Date", axis=alt.Axis(format="%b %Y", labelAngle=-30)),
-                    y=alt.Y("price:Q", title="NAV / Price"),
-                    tooltip=[alt.Tooltip("date:T", title="Date"), alt.Tooltip("price:Q", format=".2f", title="Price")],
-                ).properties(height=360)
-            )
-            st.altair_chart(line.interactive(), use_container_width=True)
+            st.vega_lite_chart(price_spec, use_container_width=True)
         else:
             st.info("No price series available.")
 
         # Net assets and net flows
-        na_df = _net_assets_series(current)
-        nf_df = _net_flows_series(current)
-        if na_df is not None or nf_df is not None:
+        if "flows" not in memo:
+            memo["flows"] = flows_chart_specs(mtime, cur, current)
+        na_spec, nf_spec = memo["flows"]
+        if na_spec is not None or nf_spec is not None:
             c1, c2 = st.columns(2)
             with c1:
                 st.caption("Net Assets Over Time")
-                if na_df is not None:
-                    na_chart = (
-                        alt.Chart(na_df)
-                        .mark_line(point=True)
-                        .encode(x=alt.X("date:T", axis=alt.Axis(format="%b %Y", labelAngle=-30)), y=alt.Y("value:Q", title="Net Assets (Bil)"), color=alt.Color("type:N", title=""))
-                    ).properties(height=320)
-                    st.altair_chart(na_chart.interactive(), use_container_width=True)
+                if na_spec is not None:
+                    st.vega_lite_chart(na_spec, use_container_width=True)
                 else:
                     st.write("-")
             with c2:
                 st.caption("Net Flows Over Time")
-                if nf_df is not None:
-                    nf_chart = (
-                        alt.Chart(nf_df)
-                        .mark_bar()
-                        .encode(x=alt.X("date:T", axis=alt.Axis(format="%b %Y", labelAngle=-30)), y=alt.Y("value:Q", title="Net Flows (Bil)"), color=alt.condition(alt.datum.value >= 0, alt.value("#2ca02c"), alt.value("#d62728")))
-                    ).properties(height=320)
-                    st.altair_chart(nf_chart.interactive(), use_container_width=True)
+                if nf_spec is not None:
+                    st.vega_lite_chart(nf_spec, use_container_width=True)
                 else:
                     st.write("-")
 
@@ -502,8 +805,12 @@ def render_detail(data: List[Dict[str, Any]]) -> None:
             st.caption("Other Fees (selected fields)")
             other_fee = current.get("otherFee") or {}
             try:
-                fee_df = pd.json_normalize(other_fee)
-                st.dataframe(fee_df.T, use_container_width=True)
+                # A flat fee dict is already the key -> value column; only nested ones need normalize + transpose
+                if isinstance(other_fee, dict) and not any(isinstance(v, dict) for v in other_fee.values()):
+                    fee_df = pd.Series(other_fee).to_frame()
+                else:
+                    fee_df = pd.json_normalize(other_fee).T
+                st.dataframe(fee_df, use_container_width=True)
             except Exception:
                 st.write("-")
 
@@ -532,6 +839,15 @@ def render_detail(data: List[Dict[str, Any]]) -> None:
     st.table(pd.Series(basic, name="Info"))
 
 
+def _to_datetimes(values: pd.Series) -> pd.Series:
+    # Vectorized parse for the usual ISO dates; anything else gets parsed per element
+    # and unparseable entries become NaT, matching a per-point to_datetime + skip
+    try:
+        return pd.to_datetime(values, format="ISO8601")
+    except (ValueError, TypeError):
+        return pd.to_datetime(values, format="mixed", errors="coerce")
+
+
 def _parse_historical_timeseries(payload: Any) -> Optional[pd.DataFrame]:
     # Support multiple shapes, including historicalData.graphData.{fund,index,category}
     if payload is None:
@@ -545,31 +861,23 @@ def _parse_historical_timeseries(payload: Any) -> Optional[pd.DataFrame]:
     # graphData with labeled series
     graph = payload.get("graphData") if isinstance(payload.get("graphData"), dict) else None
     if graph:
-        series_frames: List[pd.DataFrame] = []
-        for label_key in ["fund", "index", "category"]:
-            arr = graph.get(label_key)
-            if isinstance(arr, list) and arr:
-                # Expect items like {date: "YYYY-MM-DD", value: number}
-                recs: List[Dict[str, Any]] = []
-                for pt in arr:
-                    if not isinstance(pt, dict):
-                        continue
-                    d = pt.get("date")
-                    v = pt.get("value")
-                    if d is None or v is None:
-                        continue
-                    try:
-                        dt = pd.to_datetime(d)
-                        val = pd.to_numeric(v, errors="coerce")
-                        if pd.isna(val):
-                            continue
-                        recs.append({"date": dt, "value": float(val), "Series": label_key})
-                    except Exception:
-                        continue
-                if recs:
-                    series_frames.append(pd.DataFrame(recs))
-        if series_frames:
-            return pd.concat(series_frames, ignore_index=True).sort_values(["Series", "date"])  # type: ignore
+        # Collect every labeled point into one long frame and parse dates/values in one pass,
+        # instead of a scalar to_datetime per point and a concat of per-series frames
+        pts = [
+            (pt.get("date"), pt.get("value"), label_key)
+            for label_key in ["fund", "index", "category"]
+            if isinstance(graph.get(label_key), list)
+            for pt in graph[label_key]
+            if isinstance(pt, dict) and pt.get("date") is not None and pt.get("value") is not None
+        ]
+        if pts:
+            long = pd.DataFrame(pts, columns=["date", "value", "Series"])
+            long["date"] = _to_datetimes(long["date"])
+            long["value"] = pd.to_numeric(long["value"], errors="coerce")
+            long = long.dropna(subset=["date", "value"]).reset_index(drop=True)
+            if not long.empty:
+                long["value"] = long["value"].astype(float)
+                return long.sort_values(["Series", "date"])  # type: ignore
     # Generic fallbacks
     for key in ["series", "data", "values"]:
         if isinstance(payload.get(key), list):
@@ -578,20 +886,21 @@ def _parse_historical_timeseries(payload: Any) -> Optional[pd.DataFrame]:
     return None
 
 
-def render_performance(data: List[Dict[str, Any]]) -> None:
+def render_performance(by_isin: Dict[str, Dict[str, Any]], frames: Tuple[pd.DataFrame, pd.DataFrame]) -> None:
     st.subheader("Performance")
+    funds_df, prices_df = frames
     # Single fund selector
-    label_to_isin = {_fund_display_name(d): d.get("isin") for d in data}
+    label_to_isin = dict(zip(funds_df["label"], funds_df["isin"]))
     labels = list(label_to_isin.keys())
     sel_label = st.selectbox("Select fund", labels, key="performance_select_fund")
     cur = label_to_isin.get(sel_label)
-    current = next((d for d in data if d.get("isin") == cur), None)
+    current = by_isin.get(cur)
     if not current or current.get("_class") != "fund":
         st.info("Select a fund to view performance.")
         return
 
     # Build preferred price series (NAV preferred)
-    df_nav, src_nav = _price_series_from_any(current)
+    df_nav, src_nav = price_series(prices_df, cur)
     if df_nav is None or df_nav.empty:
         st.warning("No NAV or fallback series found for this fund.")
         return
@@ -714,7 +1023,7 @@ def render_performance(data: List[Dict[str, Any]]) -> None:
 
     st.caption("Performance (Index 100)")
     st.altair_chart(
-        alt.Chart(df_norm)
+        alt.Chart(df_norm[["date", "index100"]])
         .mark_line()
         .encode(
             x=alt.X("date:T", axis=alt.Axis(format="%b %Y", labelAngle=-30)),
@@ -759,12 +1068,34 @@ def render_performance(data: List[Dict[str, Any]]) -> None:
     # Benchmark comparison removed per user request
 
 
-def render_downloads(data: List[Dict[str, Any]]) -> None:
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _download_bytes(mtime: float) -> bytes:
+    # isin_output.json is already the indented dataset written by fetch_isins, so serve it as-is
+    with open(DATA_PATH, "rb") as f:
+        return f.read()
+
+
+def render_downloads(mtime: float) -> None:
     st.subheader("Downloads")
-    pretty = json.dumps(data, ensure_ascii=False, indent=2)
+    pretty = _download_bytes(mtime)
     st.download_button("Download JSON", pretty, file_name="isin_output.json", mime="application/json")
 
 
+@st.cache_data(show_spinner=False, max_entries=8)
+def _read_text(path: str, mtime: float) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _seed_editor(key: str, path: str, default: str) -> None:
+    # Load the file into the text area's state only when it changed on disk since the last load,
+    # so reruns neither re-read it nor clobber unsaved edits
+    mtime = os.path.getmtime(path) if os.path.exists(path) else None
+    if key not in st.session_state or st.session_state.get(f"{key}_mtime") != mtime:
+        st.session_state[key] = _read_text(path, mtime) if mtime is not None else default
+        st.session_state[f"{key}_mtime"] = mtime
+
+
 def render_settings() -> None:
     st.subheader("Settings")
     st.write("Edit the ISINs list and methods config, then refresh the dataset.")
@@ -772,24 +1103,16 @@ def render_settings() -> None:
     col_isin, col_cfg = st.columns(2)
     with col_isin:
         st.caption("ISINs.txt")
-        if os.path.exists(ISINS_PATH):
-            with open(ISINS_PATH, "r", encoding="utf-8") as f:
-                contents = f.read()
-        else:
-            contents = ""
-        new_text = st.text_area("", value=contents, height=240, key="isins")
+        _seed_editor("isins", ISINS_PATH, "")
+        new_text = st.text_area("", height=240, key="isins")
         if st.button("Save ISINs.txt"):
             with open(ISINS_PATH, "w", encoding="utf-8") as f:
                 f.write(new_text)
             st.success("Saved ISINs.txt")
     with col_cfg:
         st.caption("methods_config.json")
-        if os.path.exists(CONFIG_PATH):
-            with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-                cfg_text = f.read()
-        else:
-            cfg_text = json.dumps({"fund_methods": [], "stock_methods": []}, indent=2)
-        new_cfg = st.text_area("", value=cfg_text, height=240, key="cfg")
+        _seed_editor("cfg", CONFIG_PATH, json.dumps({"fund_methods": [], "stock_methods": []}, indent=2))
+        new_cfg = st.text_area("", height=240, key="cfg")
         if st.button("Save methods_config.json"):
             try:
                 json.loads(new_cfg)  # validate
@@ -801,6 +1124,12 @@ def render_settings() -> None:
 
     if st.button("Refresh data (full)"):
         run_fetch(full=True)
+    if st.session_state.get("fetch_job"):
+        _fetch_status()
+    result = st.session_state.pop("fetch_result", None)
+    if result is not None:
+        kind, message = result
+        (st.success if kind == "success" else st.error)(message)
 
 
 def main() -> None:
@@ -808,20 +1137,25 @@ def main() -> None:
     st.title("Fund & Stock Visualizer")
 
     tabs = st.tabs(["Overview", "Detail", "Performance", "Downloads", "Settings"])
-    data = load_data()
+    mtime = data_mtime()
+    if mtime is None:
+        st.error(f"File not found: {DATA_PATH}. Run fetch_isins.py first.")
+        data, by_isin, frames = [], {}, None
+    else:
+        data, by_isin, frames = load_dataset(mtime)
 
     with tabs[0]:
         if data:
-            render_overview(data)
+            render_overview(data, mtime)
     with tabs[1]:
         if data:
-            render_detail(data)
+            render_detail(by_isin, mtime, frames)
     with tabs[2]:
         if data:
-            render_performance(data)
+            render_performance(by_isin, frames)
     with tabs[3]:
         if data:
-            render_downloads(data)
+            render_downloads(mtime)
     with tabs[4]:
         render_settings()
 